@@ -5,9 +5,9 @@ Command-line interface for the file storage system.
 
 import argparse
 import sys
-import json
+import orjson
 from pathlib import Path
-from filer import FileStore
+from filer import FileStore, hash_prefix_range
 
 
 def cmd_ingest(args, store):
@@ -56,20 +56,14 @@ def cmd_search(args, store):
 
 def cmd_list(args, store):
     """List all files."""
-    results = store.search()  # No filters = all files
+    # No filters = all files; sorting and limit are applied by the query
+    results = store.search(limit=args.limit or None, offset=args.offset,
+                           order_by=args.sort)
     
     if not results:
         print("No files in database")
         return 0
     
-    # Sort by size if requested
-    if args.sort == "size":
-        results.sort(key=lambda x: x[2], reverse=True)
-    
-    # Apply limit
-    if args.limit:
-        results = results[:args.limit]
-    
     print(f"\nListing {len(results)} file(s):\n")
     print(f"{'Hash':<12} {'Size':>10} {'Locations':>10} {'First Path'}")
     print("-" * 80)
@@ -83,25 +77,19 @@ def cmd_list(args, store):
 
 def cmd_info(args, store):
     """Show detailed info for a specific file."""
-    import sqlite3
-    
-    conn = sqlite3.connect(store.db_path)
-    cursor = conn.execute("""
+    result = store.conn.execute("""
         SELECT hash, size, mime_type, file_extension, original_filename,
                created_at, modified_at, imported_at, 
-               local_path, original_paths, tags, metadata
-        FROM files WHERE hash = ? OR hash LIKE ?
-    """, (args.hash, f"{args.hash}%"))
-    
-    result = cursor.fetchone()
-    conn.close()
+               local_path, tags, metadata
+        FROM files WHERE hash >= ? AND hash < ? LIMIT 1
+    """, hash_prefix_range(args.hash)).fetchone()
     
     if not result:
         print(f"No file found with hash matching: {args.hash}")
         return 1
     
     (hash_val, size, mime, extension, filename, 
-     created, modified, imported, local, paths_json, tags_json, meta_json) = result
+     created, modified, imported, local, tags_json, meta_json) = result
     
     print(f"\nFile Information:")
     print("=" * 60)
@@ -115,20 +103,20 @@ def cmd_info(args, store):
     print(f"Imported:     {imported}")
     print(f"Local Path:   {local}")
     
-    paths = json.loads(paths_json)
-    print(f"\nLocations ({len(paths)}):")
-    for p in paths:
-        print(f"  {p['path']}")
-        print(f"    Source: {p['source']}, Discovered: {p['discovered_at']}")
+    locations = store.get_locations(hash_val)
+    print(f"\nLocations ({len(locations)}):")
+    for path, source, discovered_at in locations:
+        print(f"  {path}")
+        print(f"    Source: {source}, Discovered: {discovered_at}")
     
-    tags = json.loads(tags_json) if tags_json else []
+    tags = orjson.loads(tags_json) if tags_json else []
     if tags:
         print(f"\nTags: {', '.join(tags)}")
     
-    metadata = json.loads(meta_json) if meta_json else {}
+    metadata = orjson.loads(meta_json) if meta_json else {}
     if metadata:
         print(f"\nMetadata:")
-        print(json.dumps(metadata, indent=2))
+        print(orjson.dumps(metadata, option=orjson.OPT_INDENT_2).decode())
     
     return 0
 
@@ -140,31 +128,25 @@ def cmd_stats(args, store):
 
 def cmd_locate(args, store):
     """Show all locations for a file by hash."""
-    import sqlite3
-    
-    conn = sqlite3.connect(store.db_path)
-    cursor = conn.execute("""
-        SELECT hash, original_paths FROM files 
-        WHERE hash = ? OR hash LIKE ?
-    """, (args.hash, f"{args.hash}%"))
-    
-    result = cursor.fetchone()
-    conn.close()
+    result = store.conn.execute(
+        "SELECT hash FROM files WHERE hash >= ? AND hash < ? LIMIT 1",
+        hash_prefix_range(args.hash)
+    ).fetchone()
     
     if not result:
         print(f"No file found with hash matching: {args.hash}")
         return 1
     
-    hash_val, paths_json = result
-    paths = json.loads(paths_json)
+    hash_val = result[0]
+    locations = store.get_locations(hash_val)
     
     print(f"\nFile: {hash_val}")
-    print(f"Found in {len(paths)} location(s):\n")
+    print(f"Found in {len(locations)} location(s):\n")
     
-    for i, p in enumerate(paths, 1):
-        print(f"{i}. {p['path']}")
-        print(f"   Source: {p['source']}")
-        print(f"   Discovered: {p['discovered_at']}")
+    for i, (path, source, discovered_at) in enumerate(locations, 1):
+        print(f"{i}. {path}")
+        print(f"   Source: {source}")
+        print(f"   Discovered: {discovered_at}")
         print()
     
     return 0
@@ -204,6 +186,8 @@ def main():
     # List command
     list_parser = subparsers.add_parser('list', help='List all files')
     list_parser.add_argument('--limit', type=int, help='Limit number of results')
+    list_parser.add_argument('--offset', type=int, default=0,
+                             help='Skip this many results (for paging)')
     list_parser.add_argument('--sort', choices=['size'], help='Sort results')
     
     # Info command
@@ -3,14 +3,274 @@
 Simple file ingestion script for content-addressable file storage system.
 """
 
+import os
+import math
+import mmap
 import sqlite3
 import hashlib
-import json
+import orjson
 import shutil
+import threading
 import magic
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import Iterator, Optional
+
+try:
+    import blake3
+except ImportError:  # optional, SHA-256 is used for everything without it
+    blake3 = None
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+# Files at least this large are memory-mapped for hashing
+MMAP_THRESHOLD = 10 * 1024 * 1024
+# Read size for the buffered hashing path
+HASH_CHUNK_SIZE = 1024 * 1024
+# Files at least this large are hashed with multithreaded BLAKE3 if available
+BLAKE3_THRESHOLD = 100 * 1024 * 1024
+# ioctl request for a copy-on-write clone (Linux; Btrfs, XFS)
+FICLONE = 0x40049409
+# Number of ingested files written per database transaction
+INGEST_BATCH_SIZE = 1000
+
+# Flatten the JSON tag list / location sources into FTS tokens
+FTS_TAGS_SQL = "(SELECT group_concat(value, ' ') FROM json_each({row}.tags))"
+FTS_SOURCES_SQL = """(SELECT group_concat(source, ' ') FROM (
+    SELECT DISTINCT source FROM locations WHERE {where} ORDER BY source))"""
+
+# Rebuild the legacy `original_paths` JSON array from the locations table
+LOCATIONS_JSON_SQL = """(
+    SELECT json_group_array(json_object(
+        'path', path, 'source', source, 'discovered_at', discovered_at))
+    FROM (SELECT path, source, discovered_at FROM locations
+          WHERE hash = {hash} ORDER BY rowid)
+)"""
+
+
+# Per-thread read buffer for the buffered hashing path
+_hash_local = threading.local()
+
+
+def _hash_buffer() -> bytearray:
+    """Return this thread's reusable hashing buffer."""
+    buf = getattr(_hash_local, "buf", None)
+    if buf is None:
+        buf = _hash_local.buf = bytearray(HASH_CHUNK_SIZE)
+    return buf
+
+
+def hash_algorithm(size: int, large_file_algo: str = "sha256") -> str:
+    """
+    Return the hash algorithm used for a file of the given size.
+    
+    `large_file_algo` is the database's fixed choice for files of
+    BLAKE3_THRESHOLD or more (see FileStore.init_settings), so the same
+    content always gets the same hash.
+    """
+    if large_file_algo == "blake3" and size >= BLAKE3_THRESHOLD:
+        if blake3 is None:
+            raise RuntimeError("This database hashes large files with BLAKE3; "
+                               "install the blake3 package")
+        return "blake3"
+    return "sha256"
+
+
+def hash_file(filepath: Path, large_file_algo: str = "sha256") -> str:
+    """
+    Calculate the content hash of a file (see hash_algorithm).
+    
+    Very large files use BLAKE3 across all cores when the database was
+    created with it. Otherwise SHA-256: large files are memory-mapped and
+    hashed in a single call, smaller files go through hashlib.file_digest
+    so the read loop stays in C.
+    """
+    size = os.stat(filepath).st_size
+    if hash_algorithm(size, large_file_algo) == "blake3":
+        hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+        hasher.update_mmap(filepath)
+        return hasher.hexdigest()
+    
+    with open(filepath, 'rb') as f:
+        # Hint the kernel to read ahead aggressively (no-op where unsupported)
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mm, "madvise"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                return hashlib.sha256(mm).hexdigest()
+        
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        
+        # Read into a reused buffer rather than allocating a chunk per read
+        sha256 = hashlib.sha256()
+        buf = _hash_buffer()
+        view = memoryview(buf)
+        while (n := f.readinto(buf)):
+            sha256.update(view[:n])
+        return sha256.hexdigest()
+
+
+def copy_file(src, dst, size: int):
+    """
+    Copy a file into storage, preserving timestamps like shutil.copy2.
+    
+    On Linux, first tries an instant copy-on-write clone (FICLONE), then an
+    in-kernel copy_file_range. Anything else falls back to shutil.copy2.
+    """
+    if fcntl is None or not hasattr(os, "copy_file_range"):
+        shutil.copy2(src, dst)
+        return
+    
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            try:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            except OSError:
+                remaining = size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        raise OSError("copy_file_range stopped short")
+                    remaining -= copied
+    except OSError:
+        # e.g. cross-device copy on older kernels or unsupported filesystem
+        shutil.copy2(src, dst)
+        return
+    shutil.copystat(src, dst)
+
+
+def sniff_mime_type(filepath) -> str:
+    """
+    Detect MIME type using python-magic.
+    
+    libmagic reads the file itself, so formats identified past the first
+    few KiB (Office documents inside zip, ISO images) are detected too.
+    """
+    return magic.from_file(os.fspath(filepath), mime=True)
+
+
+def _hash_worker(filepath: str,
+                 large_file_algo: str = "sha256") -> tuple[str, Optional[str], Optional[str]]:
+    """
+    Hash a file in a worker process. Returns (path, hash, mime_type).
+    
+    The MIME sniff runs right after hashing, so the header is already in
+    the page cache.
+    """
+    try:
+        file_hash = hash_file(filepath, large_file_algo)
+    except (OSError, RuntimeError):
+        return filepath, None, None
+    try:
+        mime_type = sniff_mime_type(filepath)
+    except Exception:
+        mime_type = None
+    return filepath, file_hash, mime_type
+
+
+def walk_files(root, recursive: bool = True) -> Iterator[os.DirEntry]:
+    """
+    Yield a DirEntry for every file under root.
+    
+    Uses os.scandir so the file type comes from the directory listing;
+    DirEntry.stat() caches its result (from the listing on Windows, one
+    stat call elsewhere). Symlinked directories are not followed;
+    unreadable directories are skipped.
+    """
+    try:
+        with os.scandir(root) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        yield from walk_files(entry.path, recursive)
+                elif entry.is_file():
+                    yield entry
+    except OSError:
+        return
+
+
+def fts_match_query(tag: Optional[str] = None,
+                    source: Optional[str] = None) -> Optional[str]:
+    """Build an FTS5 MATCH expression for a tag and/or source prefix."""
+    terms = []
+    if tag:
+        terms.append('tags : "{}"*'.format(tag.replace('"', '""')))
+    if source:
+        terms.append('sources : "{}"*'.format(source.replace('"', '""')))
+    return " AND ".join(terms) or None
+
+
+def hash_prefix_range(prefix: str) -> tuple[str, str]:
+    """
+    Return (low, high) bounds matching hashes that start with prefix.
+    
+    `hash >= low AND hash < high` is answered by a range scan on the
+    primary key, unlike `hash LIKE 'abc%'`.
+    """
+    prefix = prefix.lower()
+    if not prefix:
+        return "", "\U0010ffff"
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+# ORDER BY clauses accepted by page_clause, keyed by sort name
+SORT_ORDERS = {
+    "size": "f.size DESC",
+}
+
+
+def page_clause(order_by: Optional[str] = None, limit: Optional[int] = None,
+                offset: int = 0) -> tuple[str, list]:
+    """Build the ORDER BY / LIMIT / OFFSET tail of a `files f` query."""
+    clause = ""
+    params = []
+    if order_by:
+        clause += f" ORDER BY {SORT_ORDERS[order_by]}"
+    if limit is not None or offset:
+        clause += " LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, offset]
+    return clause, params
+
+
+class HashFilter:
+    """
+    Bloom filter over hex content hashes.
+    
+    Answers "definitely not stored" or "maybe stored" in a few bits per
+    entry. Content hashes are already uniformly distributed, so bit
+    positions are taken straight from the digest instead of rehashing.
+    """
+    
+    def __init__(self, capacity: int, error_rate: float = 1e-4):
+        capacity = max(capacity, 1)
+        self.num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.num_probes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+    
+    def _positions(self, file_hash: str) -> Iterator[int]:
+        # Double hashing with two 64-bit slices of the digest
+        a = int(file_hash[:16], 16)
+        b = int(file_hash[16:32], 16) | 1
+        for i in range(self.num_probes):
+            yield (a + i * b) % self.num_bits
+    
+    def add(self, file_hash: str):
+        for pos in self._positions(file_hash):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+    
+    def __contains__(self, file_hash: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7))
+                   for pos in self._positions(file_hash))
 
 
 class FileStore:
@@ -19,7 +279,17 @@ class FileStore:
         self.db_path = Path(db_path)
         self.storage_root = Path(storage_root)
         self.verbose = verbose
+        # Filter of hashes already in the database, built for the duration
+        # of a directory ingest so new content skips the lookup query
+        self._known_hashes: Optional[HashFilter] = None
+        # Algorithm for files of BLAKE3_THRESHOLD or more, set by init_settings
+        self.large_file_algo = "sha256"
         self.storage_root.mkdir(exist_ok=True)
+        # Autocommit mode; batched writes manage their own transactions
+        self.conn = sqlite3.connect(self.db_path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
         self.init_database()
     
     def _print(self, *args, **kwargs):
@@ -29,10 +299,10 @@ class FileStore:
     
     def init_database(self):
         """Initialize the SQLite database with schema."""
-        conn = sqlite3.connect(self.db_path)
-        conn.execute("""
+        self.conn.execute("""
             CREATE TABLE IF NOT EXISTS files (
                 hash TEXT PRIMARY KEY,
+                hash_algo TEXT NOT NULL DEFAULT 'sha256',
                 size INTEGER NOT NULL,
                 mime_type TEXT,
                 file_extension TEXT,
@@ -50,38 +320,219 @@ class FileStore:
                 metadata TEXT
             )
         """)
-        conn.commit()
-        conn.close()
+        self._ensure_column("files", "hash_algo", "TEXT NOT NULL DEFAULT 'sha256'")
+        self.init_settings()
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_files_size ON files(size DESC)")
+        migrated = self.init_locations()
+        self.init_search_index(rebuild=migrated)
         self._print(f"Database initialized at {self.db_path}")
     
+    def init_settings(self):
+        """
+        Create the settings table and load per-database choices.
+        
+        The large-file hash algorithm is fixed the first time a database is
+        opened: BLAKE3 if it is installed, unless large files were already
+        stored with SHA-256. Deciding per run instead would give the same
+        content a different hash whenever blake3 came or went.
+        """
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        """)
+        row = self.conn.execute(
+            "SELECT value FROM settings WHERE key = 'large_file_algo'"
+        ).fetchone()
+        if row:
+            self.large_file_algo = row[0]
+            return
+        
+        stored = self.conn.execute(
+            "SELECT hash_algo FROM files WHERE size >= ? LIMIT 1",
+            (BLAKE3_THRESHOLD,)
+        ).fetchone()
+        if stored:
+            self.large_file_algo = stored[0]
+        else:
+            self.large_file_algo = "blake3" if blake3 is not None else "sha256"
+        self.conn.execute(
+            "INSERT OR IGNORE INTO settings (key, value) VALUES ('large_file_algo', ?)",
+            (self.large_file_algo,)
+        )
+    
+    def _ensure_column(self, table: str, column: str, definition: str):
+        """Add a column to an existing table if an older schema lacks it."""
+        columns = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    
+    def init_locations(self) -> bool:
+        """
+        Create the locations table (one row per place a file was seen).
+        
+        On first run, locations recorded in the legacy `original_paths`
+        JSON column are copied over. Returns True if that migration ran.
+        """
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'locations'"
+        ).fetchone()
+        
+        if not exists:
+            self.conn.executescript("""
+                BEGIN;
+                CREATE TABLE locations (
+                    hash TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    discovered_at TIMESTAMP,
+                    size INTEGER,
+                    mtime INTEGER,
+                    UNIQUE (hash, path, source)
+                );
+                CREATE INDEX idx_locations_source ON locations(source);
+                
+                INSERT OR IGNORE INTO locations (hash, path, source, discovered_at)
+                SELECT f.hash,
+                       json_extract(p.value, '$.path'),
+                       COALESCE(json_extract(p.value, '$.source'), 'unknown'),
+                       json_extract(p.value, '$.discovered_at')
+                FROM files f, json_each(f.original_paths) p;
+                COMMIT;
+            """)
+        
+        # (size, mtime) fingerprint of the file when it was seen at this path
+        self._ensure_column("locations", "size", "INTEGER")
+        self._ensure_column("locations", "mtime", "INTEGER")
+        self.conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_locations_fingerprint
+            ON locations(path, size, mtime)
+        """)
+        return not exists
+    
+    def init_search_index(self, rebuild: bool = False):
+        """
+        Create the FTS5 index over tags and sources.
+        
+        The index is contentless and keyed by the rowid of `files`; triggers
+        flatten tags and location sources into space-separated tokens. The
+        index is (re)populated when first created, when its triggers have
+        changed, or when `rebuild` is set.
+        """
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'files_fts'"
+        ).fetchone()
+        
+        # Deleting from a contentless index requires the exact values that
+        # were indexed, so every trigger recomputes them the same way.
+        # Sources are distinct and sorted, so a location only changes the
+        # indexed value when it brings a new source for that hash.
+        triggers = {
+            "files_fts_insert": f"""CREATE TRIGGER files_fts_insert AFTER INSERT ON files
+            BEGIN
+                INSERT INTO files_fts(rowid, tags, sources)
+                VALUES (new.rowid, {FTS_TAGS_SQL.format(row="new")},
+                        {FTS_SOURCES_SQL.format(where="hash = new.hash")});
+            END""",
+            "files_fts_delete": f"""CREATE TRIGGER files_fts_delete AFTER DELETE ON files
+            BEGIN
+                INSERT INTO files_fts(files_fts, rowid, tags, sources)
+                VALUES ('delete', old.rowid, {FTS_TAGS_SQL.format(row="old")},
+                        {FTS_SOURCES_SQL.format(where="hash = old.hash")});
+            END""",
+            "files_fts_update": f"""CREATE TRIGGER files_fts_update AFTER UPDATE ON files
+            BEGIN
+                INSERT INTO files_fts(files_fts, rowid, tags, sources)
+                VALUES ('delete', old.rowid, {FTS_TAGS_SQL.format(row="old")},
+                        {FTS_SOURCES_SQL.format(where="hash = old.hash")});
+                INSERT INTO files_fts(rowid, tags, sources)
+                VALUES (new.rowid, {FTS_TAGS_SQL.format(row="new")},
+                        {FTS_SOURCES_SQL.format(where="hash = new.hash")});
+            END""",
+            "locations_fts_insert": f"""CREATE TRIGGER locations_fts_insert AFTER INSERT ON locations
+            WHEN NOT EXISTS (
+                SELECT 1 FROM locations
+                WHERE hash = new.hash AND source = new.source AND rowid != new.rowid
+            )
+            BEGIN
+                INSERT INTO files_fts(files_fts, rowid, tags, sources)
+                SELECT 'delete', f.rowid, {FTS_TAGS_SQL.format(row="f")},
+                       {FTS_SOURCES_SQL.format(
+                           where="hash = new.hash AND rowid != new.rowid")}
+                FROM files f WHERE f.hash = new.hash;
+                INSERT INTO files_fts(rowid, tags, sources)
+                SELECT f.rowid, {FTS_TAGS_SQL.format(row="f")},
+                       {FTS_SOURCES_SQL.format(where="hash = new.hash")}
+                FROM files f WHERE f.hash = new.hash;
+            END""",
+        }
+        
+        # Indexed values from older trigger definitions can't be deleted
+        # with the current ones, so a changed trigger forces a rebuild
+        stored = dict(self.conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger'"
+        ))
+        if any(stored.get(name) != sql for name, sql in triggers.items()):
+            rebuild = True
+        
+        # Swap triggers and repopulate together, so an interrupted upgrade
+        # is retried on the next start
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS files_fts "
+                "USING fts5(tags, sources, content='')"
+            )
+            for name, sql in triggers.items():
+                if stored.get(name) != sql:
+                    self.conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+                    self.conn.execute(sql)
+            
+            if not exists or rebuild:
+                if exists:
+                    self.conn.execute(
+                        "INSERT INTO files_fts(files_fts) VALUES ('delete-all')"
+                    )
+                self.conn.execute(f"""
+                    INSERT INTO files_fts(rowid, tags, sources)
+                    SELECT rowid, {FTS_TAGS_SQL.format(row="files")},
+                           {FTS_SOURCES_SQL.format(where="hash = files.hash")}
+                    FROM files
+                """)
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+    
     def hash_file(self, filepath: Path) -> str:
-        """Calculate SHA-256 hash of file."""
-        sha256 = hashlib.sha256()
-        with open(filepath, 'rb') as f:
-            for chunk in iter(lambda: f.read(8192), b''):
-                sha256.update(chunk)
-        return sha256.hexdigest()
+        """Calculate the content hash of a file."""
+        return hash_file(filepath, self.large_file_algo)
     
     def get_storage_path(self, file_hash: str) -> Path:
         """Convert hash to sharded storage path."""
         return self.storage_root / file_hash[:2] / file_hash[2:4] / file_hash
     
-    def extract_path_tags(self, filepath: Path) -> list[str]:
+    def extract_path_tags(self, filepath) -> list[str]:
         """Extract directory components as tags."""
-        parts = filepath.parts[:-1]  # exclude filename
-        # Filter out common root directories
-        return [p for p in parts if p not in ('/', '.', '..')]
+        directory = os.path.dirname(os.fspath(filepath))  # exclude filename
+        directory = os.path.splitdrive(directory)[1]
+        if os.altsep:
+            directory = directory.replace(os.altsep, os.sep)
+        # Filter out root and relative components
+        return [p for p in directory.split(os.sep) if p not in ('', '.', '..')]
     
     def detect_mime_type(self, filepath: Path) -> Optional[str]:
         """Detect MIME type using python-magic."""
         try:
-            return magic.from_file(str(filepath), mime=True)
+            return sniff_mime_type(filepath)
         except Exception as e:
             self._print(f"  Warning: Could not detect MIME type: {e}")
             return None
     
     def ingest_file(self, filepath: Path, source: str = "local", 
-                    additional_tags: list[str] = None) -> dict:
+                    additional_tags: list[str] = None,
+                    file_hash: Optional[str] = None) -> dict:
         """
         Ingest a file into the system.
         
@@ -89,6 +540,7 @@ class FileStore:
             filepath: Path to file to ingest
             source: Source identifier (e.g., "Dropbox", "iCloud", "OldMacDrive")
             additional_tags: Extra tags to add beyond path-extracted tags
+            file_hash: Precomputed hash (skips hashing when given)
             
         Returns:
             Dict with ingestion results
@@ -99,53 +551,114 @@ class FileStore:
         if not filepath.is_file():
             return {"status": "error", "message": "Not a file"}
         
-        # Get file stats
-        stat = filepath.stat()
+        pending = {}
+        try:
+            result = self._compute_record(filepath, source, additional_tags,
+                                          file_hash, pending)
+        except RuntimeError as e:  # large file, blake3 missing
+            return {"status": "error", "message": str(e)}
+        self._persist_records(pending)
+        return result
+    
+    def lookup_fingerprint(self, path: str, stat: os.stat_result) -> Optional[str]:
+        """
+        Return the recorded hash for a path whose size and mtime are unchanged.
+        
+        Lets re-ingesting a location skip reading the file entirely.
+        """
+        row = self.conn.execute(
+            "SELECT hash FROM locations WHERE path = ? AND size = ? AND mtime = ? LIMIT 1",
+            (path, stat.st_size, stat.st_mtime_ns)
+        ).fetchone()
+        return row[0] if row else None
+    
+    def _compute_record(self, filepath, source: str,
+                        additional_tags: Optional[list[str]],
+                        file_hash: Optional[str], pending: dict,
+                        stat: Optional[os.stat_result] = None,
+                        mime_type: Optional[str] = None) -> dict:
+        """
+        Work out the database changes for one file without writing them.
+        
+        New files are copied into storage. Records that still need to be
+        written are accumulated in `pending` (keyed by hash) so duplicates
+        within the same batch are detected before anything is persisted.
+        
+        `filepath` may be a str or Path; it is handled as a plain string
+        throughout, since this runs once per file on large ingests.
+        
+        Returns:
+            Dict with ingestion results
+        """
+        path_str = os.fspath(filepath)
+        filename = os.path.basename(path_str)
+        
+        # Get file stats (reuse the directory scan's result when given)
+        if stat is None:
+            stat = os.stat(path_str)
+        now = datetime.now()
         
-        # Calculate hash
-        self._print(f"Hashing {filepath.name}...", end=" ")
-        file_hash = self.hash_file(filepath)
+        # Calculate hash (unless this path was already seen unchanged)
+        if file_hash is None:
+            file_hash = self.lookup_fingerprint(path_str, stat)
+        if file_hash is None:
+            self._print(f"Hashing {filename}...", end=" ")
+            file_hash = self.hash_file(path_str)
+        else:
+            self._print(f"Ingesting {filename}...", end=" ")
         self._print(f"[{file_hash[:8]}...]")
         
-        # Check if already exists
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.execute("SELECT hash, original_paths FROM files WHERE hash = ?", 
-                            (file_hash,))
-        existing = cursor.fetchone()
+        new_location = {
+            "hash": file_hash,
+            "path": path_str,
+            "source": source,
+            "discovered_at": now.isoformat(),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns
+        }
+        
+        # Check if already exists (in this batch or in the database)
+        record = pending.get(file_hash)
+        if record and record["row"] is not None:
+            # New in this batch, nothing stored yet
+            stored_count, stored_exact, stored_current = 0, 0, 0
+        elif self._known_hashes is not None and file_hash not in self._known_hashes:
+            stored_count, stored_exact, stored_current = 0, 0, 0
+        else:
+            stored_count, stored_exact, stored_current = self.conn.execute("""
+                SELECT COUNT(*), COALESCE(SUM(path = ? AND source = ?), 0),
+                       COALESCE(SUM(path = ? AND source = ? AND size IS ? AND mtime IS ?), 0)
+                FROM locations WHERE hash = ?
+            """, (path_str, source, path_str, source, stat.st_size,
+                  stat.st_mtime_ns, file_hash)).fetchone()
         
-        if existing:
+        if record or stored_count:
             # File exists - add this as an alternate location
-            existing_paths = json.loads(existing[1])
-            new_location = {
-                "path": str(filepath),
-                "source": source,
-                "discovered_at": datetime.now().isoformat()
-            }
+            batch_locations = record["locations"] if record else []
             
             # Check if this exact path already recorded
-            if any(p["path"] == str(filepath) and p["source"] == source for p in existing_paths):
+            if stored_exact or any(p["path"] == path_str and p["source"] == source
+                                   for p in batch_locations):
                 self._print(f"  → Already exists (exact path already recorded)")
-                conn.close()
+                if stored_exact and not stored_current:
+                    # Content unchanged but size/mtime moved on; refresh the
+                    # fingerprint so the next run can skip hashing this path
+                    record = pending.setdefault(file_hash, {"row": None, "locations": []})
+                    record.setdefault("refresh", []).append(new_location)
                 return {
                     "status": "duplicate",
-                    "hash": file_hash,
-                    "paths": existing_paths
+                    "hash": file_hash
                 }
             
             # Add new location
-            existing_paths.append(new_location)
-            conn.execute(
-                "UPDATE files SET original_paths = ? WHERE hash = ?",
-                (json.dumps(existing_paths), file_hash)
-            )
-            conn.commit()
-            conn.close()
+            record = pending.setdefault(file_hash, {"row": None, "locations": []})
+            record["locations"].append(new_location)
             
-            self._print(f"  → Added as alternate location (total locations: {len(existing_paths)})")
+            total = stored_count + len(record["locations"])
+            self._print(f"  → Added as alternate location (total locations: {total})")
             return {
                 "status": "alternate_location",
-                "hash": file_hash,
-                "paths": existing_paths
+                "hash": file_hash
             }
         
         # Get storage path and create directories
@@ -154,50 +667,45 @@ class FileStore:
         
         # Copy file to storage (preserves timestamps)
         self._print(f"  → Copying to {storage_path.relative_to(self.storage_root)}")
-        shutil.copy2(filepath, storage_path)
+        try:
+            copy_file(path_str, storage_path, stat.st_size)
+        except OSError:
+            storage_path.unlink(missing_ok=True)  # don't leave a partial blob
+            raise
         
         # Extract tags from path and merge with additional tags
-        path_tags = self.extract_path_tags(filepath)
+        path_tags = self.extract_path_tags(path_str)
         all_tags = list(set(path_tags + (additional_tags or [])))  # dedupe
         
         # Extract file extension
-        file_extension = filepath.suffix.lower() if filepath.suffix else ""
+        file_extension = os.path.splitext(filename)[1].lower()
         
-        # Detect MIME type
-        mime_type = self.detect_mime_type(filepath)
+        # Detect MIME type (unless a hashing worker already did)
+        if mime_type is None:
+            mime_type = self.detect_mime_type(path_str)
         if mime_type:
             self._print(f"  → MIME type: {mime_type}")
         
-        # Prepare metadata - store paths as array
-        original_paths = [{
-            "path": str(filepath),
-            "source": source,
-            "discovered_at": datetime.now().isoformat()
-        }]
-        
-        # Insert into database
-        conn.execute("""
-            INSERT INTO files (
-                hash, size, mime_type, file_extension, original_filename,
-                created_at, modified_at, imported_at,
-                local_path, original_paths, tags, metadata
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            file_hash,
-            stat.st_size,
-            mime_type,
-            file_extension,
-            filepath.name,
-            datetime.fromtimestamp(stat.st_ctime),
-            datetime.fromtimestamp(stat.st_mtime),
-            datetime.now(),
-            str(storage_path),
-            json.dumps(original_paths),
-            json.dumps(all_tags),
-            json.dumps({})
-        ))
-        conn.commit()
-        conn.close()
+        if self._known_hashes is not None:
+            self._known_hashes.add(file_hash)
+        
+        pending[file_hash] = {
+            "locations": [new_location],
+            "row": {
+                "hash": file_hash,
+                "hash_algo": hash_algorithm(stat.st_size, self.large_file_algo),
+                "size": stat.st_size,
+                "mime_type": mime_type,
+                "file_extension": file_extension,
+                "original_filename": filename,
+                "created_at": datetime.fromtimestamp(stat.st_ctime),
+                "modified_at": datetime.fromtimestamp(stat.st_mtime),
+                "imported_at": now,
+                "local_path": str(storage_path),
+                "tags": orjson.dumps(all_tags).decode(),
+                "metadata": orjson.dumps({}).decode()
+            }
+        }
         
         self._print(f"  ✓ Ingested successfully")
         return {
@@ -206,6 +714,52 @@ class FileStore:
             "storage_path": str(storage_path)
         }
     
+    def _persist_records(self, pending: dict):
+        """Write accumulated records to the database in a single transaction."""
+        inserts = []
+        locations = []
+        refreshes = []
+        for record in pending.values():
+            locations.extend(record["locations"])
+            refreshes.extend(record.get("refresh", ()))
+            if record["row"] is not None:
+                # original_paths is a snapshot of the locations known at
+                # insert time, written only to satisfy its NOT NULL column;
+                # it is never updated, so read locations instead
+                paths = [{k: loc[k] for k in ("path", "source", "discovered_at")}
+                         for loc in record["locations"]]
+                inserts.append({**record["row"], "original_paths": orjson.dumps(paths).decode()})
+        
+        if not locations and not refreshes:
+            return
+        
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.executemany("""
+                INSERT INTO files (
+                    hash, hash_algo, size, mime_type, file_extension, original_filename,
+                    created_at, modified_at, imported_at,
+                    local_path, original_paths, tags, metadata
+                ) VALUES (
+                    :hash, :hash_algo, :size, :mime_type, :file_extension, :original_filename,
+                    :created_at, :modified_at, :imported_at,
+                    :local_path, :original_paths, :tags, :metadata
+                )
+            """, inserts)
+            self.conn.executemany("""
+                INSERT OR IGNORE INTO locations (
+                    hash, path, source, discovered_at, size, mtime
+                ) VALUES (:hash, :path, :source, :discovered_at, :size, :mtime)
+            """, locations)
+            self.conn.executemany("""
+                UPDATE locations SET size = :size, mtime = :mtime
+                WHERE hash = :hash AND path = :path AND source = :source
+            """, refreshes)
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+    
     def ingest_directory(self, dirpath: Path, source: str = "local", 
                         recursive: bool = True, additional_tags: list[str] = None):
         """
@@ -222,67 +776,149 @@ class FileStore:
             self._print(f"Error: {dirpath} is not a directory")
             return
         
-        pattern = "**/*" if recursive else "*"
-        files = [f for f in dirpath.glob(pattern) if f.is_file()]
+        stats = {"success": 0, "duplicate": 0, "alternate_location": 0, "error": 0}
+        
+        # Stat every entry once up front; files that vanished since the
+        # scan are counted as errors rather than aborting the whole run
+        files = []
+        for entry in walk_files(dirpath, recursive):
+            try:
+                files.append((entry.path, entry.stat()))
+            except OSError as e:
+                self._print(f"Error: could not read {entry.path}: {e}")
+                stats["error"] += 1
+        # Read in on-disk (inode) order to cut seeking on spinning disks
+        files.sort(key=lambda f: (f[1].st_dev, f[1].st_ino))
         
         self._print(f"\nIngesting {len(files)} files from {dirpath}")
         self._print("=" * 60)
         
-        stats = {"success": 0, "duplicate": 0, "alternate_location": 0, "error": 0}
+        pending = {}
+        stored = self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        self._known_hashes = HashFilter(stored + len(files))
+        for (file_hash,) in self.conn.execute("SELECT hash FROM files"):
+            self._known_hashes.add(file_hash)
         
-        for filepath in files:
-            result = self.ingest_file(filepath, source, additional_tags)
-            stats[result["status"]] += 1
+        # Paths already recorded with the same size and mtime need no hashing
+        fingerprints = {}
+        for path, stat in files:
+            file_hash = self.lookup_fingerprint(path, stat)
+            if file_hash:
+                fingerprints[path] = file_hash
+        # Check up front that every file left can be hashed (a BLAKE3
+        # database needs the blake3 package for large files)
+        unhashable = set()
+        for path, stat in files:
+            if path in fingerprints:
+                continue
+            try:
+                hash_algorithm(stat.st_size, self.large_file_algo)
+            except RuntimeError as e:
+                self._print(f"Error: could not hash {path}: {e}")
+                stats["error"] += 1
+                unhashable.add(path)
+        if unhashable:
+            files = [f for f in files if f[0] not in unhashable]
+        to_hash = [path for path, _ in files if path not in fingerprints]
+        
+        try:
+            # Hash in worker processes; database writes stay on this thread.
+            # No pool is started when every file matched its fingerprint.
+            pool = ProcessPoolExecutor(max_workers=os.cpu_count()) if to_hash else nullcontext()
+            with pool as executor:
+                worker = partial(_hash_worker, large_file_algo=self.large_file_algo)
+                hashed = executor.map(worker, to_hash, chunksize=8) if to_hash else iter(())
+                for i, (path, stat) in enumerate(files, 1):
+                    file_hash = fingerprints.get(path)
+                    mime_type = None
+                    if file_hash is None:
+                        _, file_hash, mime_type = next(hashed)
+                    if file_hash is None:
+                        self._print(f"Error: could not read {path}")
+                        stats["error"] += 1
+                        continue
+                    try:
+                        result = self._compute_record(path, source,
+                                                      additional_tags, file_hash,
+                                                      pending, stat=stat,
+                                                      mime_type=mime_type)
+                    except OSError as e:
+                        self._print(f"Error: could not ingest {path}: {e}")
+                        stats["error"] += 1
+                        continue
+                    stats[result["status"]] += 1
+                    
+                    if i % INGEST_BATCH_SIZE == 0:
+                        self._persist_records(pending)
+                        pending.clear()
+            
+            self._persist_records(pending)
+        except BaseException:
+            # Record files already copied into storage before giving up
+            # (including on Ctrl-C)
+            self._persist_records(pending)
+            raise
+        finally:
+            self._known_hashes = None
         
         self._print("\n" + "=" * 60)
         self._print(f"Summary: {stats['success']} new, {stats['alternate_location']} alternate locations, " +
               f"{stats['duplicate']} exact duplicates, {stats['error']} errors")
     
-    def search(self, tag: Optional[str] = None, source: Optional[str] = None):
-        """Simple search function."""
-        conn = sqlite3.connect(self.db_path)
+    def get_locations(self, file_hash: str) -> list[tuple[str, str, str]]:
+        """Return (path, source, discovered_at) for every location of a file."""
+        return self.conn.execute("""
+            SELECT path, source, discovered_at FROM locations
+            WHERE hash = ? ORDER BY rowid
+        """, (file_hash,)).fetchall()
+    
+    def search(self, tag: Optional[str] = None, source: Optional[str] = None,
+               limit: Optional[int] = None, offset: int = 0,
+               order_by: Optional[str] = None):
+        """
+        Simple search function.
         
-        query = "SELECT hash, original_paths, size FROM files WHERE 1=1"
+        Args:
+            tag: Tag prefix to match
+            source: Source prefix to match
+            limit: Maximum number of results (None for all)
+            offset: Number of results to skip
+            order_by: Sort name from SORT_ORDERS (e.g. "size")
+        """
+        query = (f"SELECT f.hash, {LOCATIONS_JSON_SQL.format(hash='f.hash')}, f.size"
+                 " FROM files f")
         params = []
         
-        if tag:
-            query += " AND tags LIKE ?"
-            params.append(f'%{tag}%')
+        match = fts_match_query(tag, source)
+        if match:
+            query += (" JOIN files_fts ON files_fts.rowid = f.rowid"
+                      " WHERE files_fts MATCH ?")
+            params.append(match)
         
-        if source:
-            query += " AND original_paths LIKE ?"
-            params.append(f'%{source}%')
+        clause, page_params = page_clause(order_by, limit, offset)
+        query += clause
+        params += page_params
         
-        cursor = conn.execute(query, params)
+        cursor = self.conn.execute(query, params)
         results = cursor.fetchall()
-        conn.close()
         
         # Parse paths for display
         parsed_results = []
         for hash_val, paths_json, size in results:
-            paths = json.loads(paths_json)
+            paths = orjson.loads(paths_json)
             parsed_results.append((hash_val, paths, size))
         
         return parsed_results
     
     def stats(self):
         """Print database statistics."""
-        conn = sqlite3.connect(self.db_path)
-        
-        total = conn.execute("SELECT COUNT(*), SUM(size) FROM files").fetchone()
-        all_files = conn.execute("SELECT original_paths FROM files").fetchall()
-        
-        conn.close()
-        
-        # Count sources and locations
-        source_counts = {}
-        total_locations = 0
-        for (paths_json,) in all_files:
-            paths = json.loads(paths_json)
-            total_locations += len(paths)
-            for p in paths:
-                source = p.get("source", "unknown")
-                source_counts[source] = source_counts.get(source, 0) + 1
+        total = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files"
+        ).fetchone()
+        total_locations = self.conn.execute("SELECT COUNT(*) FROM locations").fetchone()[0]
+        source_counts = dict(self.conn.execute(
+            "SELECT source, COUNT(*) FROM locations GROUP BY source"
+        ).fetchall())
         
         print(f"\nFile Store Statistics")
         print("=" * 60)
@@ -5,8 +5,9 @@ Usage: python ingest.py path/to/files
 """
 
 import sys
+import time
 from pathlib import Path
-from filer import FileStore
+from filer import FileStore, walk_files
 
 
 def count_files(path: Path, recursive: bool = True) -> list[Path]:
@@ -14,23 +15,36 @@ def count_files(path: Path, recursive: bool = True) -> list[Path]:
     if path.is_file():
         return [path]
     
-    pattern = "**/*" if recursive else "*"
-    return [f for f in path.glob(pattern) if f.is_file()]
+    return [Path(entry.path) for entry in walk_files(path, recursive)]
+
+
+# Minimum seconds between progress bar redraws
+PROGRESS_INTERVAL = 0.1
+_last_render = 0.0
 
 
 def print_progress(current: int, total: int, stats: dict, width: int = 50):
-    """Print progress bar with stats (overwrites same line)."""
+    """Print progress bar with stats (overwrites same line, at most 10x/sec)."""
+    global _last_render
+    now = time.monotonic()
+    if current < total and now - _last_render < PROGRESS_INTERVAL:
+        return
+    _last_render = now
+    
     percent = current / total if total > 0 else 0
     filled = int(width * percent)
     bar = '█' * filled + '░' * (width - filled)
     
-    # \r returns to start of line, end='' prevents newline
-    print(f"\r[{bar}] {current}/{total} | "
-          f"New: {stats['success']} | "
-          f"Alt: {stats['alternate_location']} | "
-          f"Dup: {stats['duplicate']} | "
-          f"Err: {stats['error']}", 
-          end='', flush=True)
+    # \r returns to start of line; emitted as a single write + flush
+    line = "".join((
+        f"\r[{bar}] {current}/{total} | ",
+        f"New: {stats['success']} | ",
+        f"Alt: {stats['alternate_location']} | ",
+        f"Dup: {stats['duplicate']} | ",
+        f"Err: {stats['error']}",
+    ))
+    sys.stdout.write(line)
+    sys.stdout.flush()
 
 
 def main():
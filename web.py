@@ -3,14 +3,69 @@
 Simple Flask web viewer for the file storage system.
 """
 
-from flask import Flask, render_template, send_file, jsonify, request
+from flask import (Flask, render_template, send_file, jsonify, request, g,
+                   stream_with_context)
 from pathlib import Path
-import mimetypes
-from filer import FileStore
+import queue
+import sqlite3
+import orjson
+from filer import (FileStore, fts_match_query, page_clause, LOCATIONS_JSON_SQL,
+                   SORT_ORDERS)
 
 app = Flask(__name__)
 store = FileStore()
 
+# Queries are fixed strings so each pooled connection's statement cache
+# can reuse the compiled statements across requests
+FILES_QUERY = f"""
+    SELECT f.hash, {LOCATIONS_JSON_SQL.format(hash='f.hash')}, f.size, f.mime_type, f.original_filename, 
+           f.tags, f.created_at 
+    FROM files f
+"""
+FILES_MATCH_CLAUSE = " JOIN files_fts ON files_fts.rowid = f.rowid WHERE files_fts MATCH ?"
+TOTALS_QUERY = "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files"
+LOCATION_COUNT_QUERY = "SELECT COUNT(*) FROM locations"
+SOURCE_COUNTS_QUERY = "SELECT source, COUNT(*) FROM locations GROUP BY source"
+TAG_COUNTS_QUERY = """
+    SELECT t.value, COUNT(*) FROM files, json_each(files.tags) t
+    GROUP BY t.value ORDER BY 2 DESC LIMIT 20
+"""
+MIME_TYPE_QUERY = "SELECT mime_type FROM files WHERE hash = ?"
+FILE_INFO_QUERY = f"""
+    SELECT hash, size, mime_type, file_extension, original_filename,
+           created_at, modified_at, imported_at, local_path, 
+           {LOCATIONS_JSON_SQL.format(hash='files.hash')}, tags, metadata
+    FROM files WHERE hash = ?
+"""
+
+# Idle connections, reused across requests instead of reconnecting each time
+_db_pool = queue.SimpleQueue()
+
+
+def get_db() -> sqlite3.Connection:
+    """Borrow a pooled database connection for the current request."""
+    if 'db' not in g:
+        try:
+            g.db = _db_pool.get_nowait()
+        except queue.Empty:
+            g.db = sqlite3.connect(store.db_path, check_same_thread=False,
+                                   cached_statements=256)
+    return g.db
+
+
+@app.teardown_appcontext
+def release_db(exception):
+    """Return the request's connection to the pool."""
+    db = g.pop('db', None)
+    if db is not None:
+        _db_pool.put(db)
+
+
+def json_response(data):
+    """Serialize with orjson, bypassing Flask's json provider."""
+    return app.response_class(orjson.dumps(data), mimetype='application/json')
+
+
 @app.route('/')
 def index():
     """Main page - file browser."""
@@ -21,83 +76,73 @@ def api_files():
     """API endpoint to get all files."""
     tag = request.args.get('tag')
     source = request.args.get('source')
+    limit = request.args.get('limit', type=int)
+    offset = request.args.get('offset', 0, type=int)
+    sort = request.args.get('sort')
+    if sort not in SORT_ORDERS:
+        sort = None
     
-    import sqlite3
-    import json
-    
-    conn = sqlite3.connect(store.db_path)
-    
-    query = """
-        SELECT hash, original_paths, size, mime_type, original_filename, 
-               tags, created_at 
-        FROM files WHERE 1=1
-    """
+    query = FILES_QUERY
     params = []
     
-    if tag:
-        query += " AND tags LIKE ?"
-        params.append(f'%{tag}%')
+    match = fts_match_query(tag, source)
+    if match:
+        query += FILES_MATCH_CLAUSE
+        params.append(match)
     
-    if source:
-        query += " AND original_paths LIKE ?"
-        params.append(f'%{source}%')
+    clause, page_params = page_clause(sort, limit, offset)
+    query += clause
+    params += page_params
     
+    conn = get_db()
     cursor = conn.execute(query, params)
-    results = cursor.fetchall()
-    conn.close()
-    
-    files = []
-    for hash_val, paths_json, size, mime_type, filename, tags_json, created_at in results:
-        paths = json.loads(paths_json)
-        files.append({
-            'hash': hash_val,
-            'hash_short': hash_val[:8],
-            'size': size,
-            'size_mb': round(size / (1024**2), 2),
-            'locations': paths,
-            'location_count': len(paths),
-            'mime_type': mime_type,
-            'filename': filename,
-            'tags': json.loads(tags_json) if tags_json else [],
-            'created_at': created_at
-        })
-    
-    return jsonify(files)
+    # The stream outlives the app context, so the generator owns the
+    # connection and returns it to the pool once the response is done
+    g.pop('db')
+    
+    def generate():
+        # Emit the JSON array row by row so memory stays flat
+        try:
+            yield b'['
+            for i, (hash_val, paths_json, size, mime_type, filename,
+                    tags_json, created_at) in enumerate(cursor):
+                paths = orjson.loads(paths_json)
+                row = orjson.dumps({
+                    'hash': hash_val,
+                    'hash_short': hash_val[:8],
+                    'size': size,
+                    'size_mb': round(size / (1024**2), 2),
+                    'locations': paths,
+                    'location_count': len(paths),
+                    'mime_type': mime_type,
+                    'filename': filename,
+                    'tags': orjson.loads(tags_json) if tags_json else [],
+                    'created_at': created_at
+                })
+                yield b',' + row if i else row
+            yield b']'
+        finally:
+            cursor.close()
+            _db_pool.put(conn)
+    
+    return app.response_class(stream_with_context(generate()),
+                              mimetype='application/json')
 
 @app.route('/api/stats')
 def api_stats():
     """API endpoint for statistics."""
-    import sqlite3
-    import json
+    conn = get_db()
+    total = conn.execute(TOTALS_QUERY).fetchone()
+    total_locations = conn.execute(LOCATION_COUNT_QUERY).fetchone()[0]
+    source_counts = dict(conn.execute(SOURCE_COUNTS_QUERY).fetchall())
+    tag_counts = dict(conn.execute(TAG_COUNTS_QUERY).fetchall())
     
-    conn = sqlite3.connect(store.db_path)
-    total = conn.execute("SELECT COUNT(*), SUM(size) FROM files").fetchone()
-    all_files = conn.execute("SELECT original_paths, tags FROM files").fetchall()
-    conn.close()
-    
-    # Count sources and tags
-    source_counts = {}
-    tag_counts = {}
-    total_locations = 0
-    
-    for paths_json, tags_json in all_files:
-        paths = json.loads(paths_json)
-        total_locations += len(paths)
-        for p in paths:
-            source = p.get("source", "unknown")
-            source_counts[source] = source_counts.get(source, 0) + 1
-        
-        if tags_json:
-            tags = json.loads(tags_json)
-            for tag in tags:
-                tag_counts[tag] = tag_counts.get(tag, 0) + 1
-    
-    return jsonify({
+    return json_response({
         'unique_files': total[0],
         'total_locations': total_locations,
         'total_size_gb': round(total[1] / (1024**3), 2),
         'sources': source_counts,
-        'tags': dict(sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)[:20])
+        'tags': tag_counts
     })
 
 @app.route('/file/<hash>')
@@ -108,27 +153,16 @@ def view_file(hash):
     if not file_path.exists():
         return "File not found", 404
     
-    # Guess MIME type
-    mime_type, _ = mimetypes.guess_type(str(file_path))
+    # MIME type was detected at ingest time
+    row = get_db().execute(MIME_TYPE_QUERY, (hash,)).fetchone()
+    mime_type = row[0] if row else None
     
     return send_file(file_path, mimetype=mime_type)
 
 @app.route('/api/file/<hash>/info')
 def file_info(hash):
     """Get detailed file info."""
-    import sqlite3
-    import json
-    
-    conn = sqlite3.connect(store.db_path)
-    cursor = conn.execute("""
-        SELECT hash, size, mime_type, file_extension, original_filename,
-               created_at, modified_at, imported_at, local_path, 
-               original_paths, tags, metadata
-        FROM files WHERE hash = ?
-    """, (hash,))
-    
-    result = cursor.fetchone()
-    conn.close()
+    result = get_db().execute(FILE_INFO_QUERY, (hash,)).fetchone()
     
     if not result:
         return jsonify({'error': 'File not found'}), 404
@@ -136,7 +170,7 @@ def file_info(hash):
     (hash_val, size, mime_type, ext, filename, created, modified, 
      imported, local, paths_json, tags_json, meta_json) = result
     
-    return jsonify({
+    return json_response({
         'hash': hash_val,
         'size': size,
         'size_mb': round(size / (1024**2), 2),
@@ -147,9 +181,9 @@ def file_info(hash):
         'modified_at': modified,
         'imported_at': imported,
         'local_path': local,
-        'locations': json.loads(paths_json),
-        'tags': json.loads(tags_json) if tags_json else [],
-        'metadata': json.loads(meta_json) if meta_json else {}
+        'locations': orjson.loads(paths_json),
+        'tags': orjson.loads(tags_json) if tags_json else [],
+        'metadata': orjson.loads(meta_json) if meta_json else {}
     })
 
 if __name__ == '__main__':